@@ -5,9 +5,11 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+import redis.asyncio as redis
 from datetime import datetime, timezone
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from typing import Union
 from pydantic import BaseModel
@@ -21,13 +23,44 @@ db = None
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
+# Pool sizes are per process: every uvicorn worker holds its own pool, so a
+# host can open up to MONGO_MAX_POOL_SIZE * WEB_CONCURRENCY connections
+mongo_max_pool_size = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+mongo_min_pool_size = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+
+@lru_cache(maxsize=1)
+def get_client():
+    """Shared Motor client with a configurable connection pool; dates are read back as UTC-aware"""
+    return AsyncIOMotorClient(
+        database_url,
+        maxPoolSize=mongo_max_pool_size,
+        minPoolSize=mongo_min_pool_size,
+        serverSelectionTimeoutMS=2000,
+        socketTimeoutMS=5000,
+        compressors="zstd",
+        tz_aware=True,
+    )
+
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    _client = get_client()
     db = _client[database_name]
 
+# Optional Redis cache for hot read paths
+cache = None
+redis_url = os.getenv("REDIS_URL")
+
+if redis_url:
+    # Short timeouts so an unreachable Redis degrades to a cache miss quickly
+    cache = redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
-    """Insert a single document with timestamp"""
+def utc_now():
+    """Current UTC time truncated to the millisecond precision BSON dates keep"""
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp and return it, including its new _id"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
 
@@ -37,19 +70,28 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     else:
         data_dict = data.copy()
 
-    data_dict['created_at'] = datetime.now(timezone.utc)
-    data_dict['updated_at'] = datetime.now(timezone.utc)
+    # Truncated so the returned document matches what a later read gives back
+    now = utc_now()
+    data_dict['created_at'] = now
+    data_dict['updated_at'] = now
 
-    result = db[collection_name].insert_one(data_dict)
-    return str(result.inserted_id)
+    result = await db[collection_name].insert_one(data_dict)
+    data_dict['_id'] = result.inserted_id
+    return data_dict
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None,
+                        projection: dict = None, sort: list = None):
+    """Get documents from collection, optionally projected and sorted"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
-    cursor = db[collection_name].find(filter_dict or {})
-    if limit:
-        cursor = cursor.limit(limit)
-    
-    return list(cursor)
+    cursor = db[collection_name].find(filter_dict or {}, projection=projection, sort=sort)
+    return await cursor.to_list(limit or None)
+
+async def aggregate_documents(collection_name: str, pipeline: list):
+    """Run an aggregation pipeline and return all resulting documents"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    cursor = db[collection_name].aggregate(pipeline)
+    return await cursor.to_list(None)
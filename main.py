@@ -1,48 +1,165 @@
+import asyncio
+import logging
 import os
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+import re
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Annotated, List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, TypeAdapter, ValidationError
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from redis import RedisError
 
-from database import db, create_document, get_documents
+from database import db, cache, aggregate_documents, create_document, utc_now
 from schemas import Property, Inquiry
 
-app = FastAPI(title="Real Estate Listing API")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Real Estate Listing API", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    # Comma-separated allowlist, e.g. "https://app.example.com,http://localhost:3000"
+    allow_origins=[
+        origin.strip()
+        for origin in os.getenv("FRONTEND_ORIGIN", "https://example.com").split(",")
+        if origin.strip()
+    ],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 
-def to_public_id(doc):
-    if not doc:
-        return doc
-    d = dict(doc)
-    if d.get("_id"):
-        d["id"] = str(d.pop("_id"))
-    # Convert any datetime to isoformat string for JSON cleanliness
-    for key, val in list(d.items()):
-        try:
-            import datetime
-            if isinstance(val, (datetime.datetime, datetime.date)):
-                d[key] = val.isoformat()
-        except Exception:
-            pass
-    return d
+# Response models
+class PropertyOut(Property):
+    # Stored documents may carry fields the input schema no longer accepts
+    model_config = ConfigDict(populate_by_name=True, extra="ignore")
+
+    id: Annotated[str, BeforeValidator(str)] = Field(alias="_id")
+
+
+class PropertySummaryOut(BaseModel):
+    """Slim card shape used by the property list"""
+    id: str
+    title: str
+    address: str
+    city: str
+    price: int
+    status: str
+    beds: float
+    baths: float
+    sqft: int
+    photos: List[str] = Field(default_factory=list)
+
+
+# Only the fields a list card renders; photos is trimmed to the cover image and
+# the ObjectId is stringified server-side so results need no Python-side fixup
+PROPERTY_LIST_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "title": 1,
+    "address": 1,
+    "city": 1,
+    "price": 1,
+    "status": 1,
+    "beds": 1,
+    "baths": 1,
+    "sqft": 1,
+    "photos": {"$slice": [{"$ifNull": ["$photos", []]}, 1]},
+}
+
+
+def property_response(doc):
+    # Encode straight to JSON bytes in pydantic-core (datetimes included),
+    # skipping the intermediate dict and FastAPI's jsonable_encoder pass
+    payload = PropertyOut.model_validate(doc).model_dump_json()
+    return Response(payload, media_type="application/json")
+
+
+# Validates and encodes a whole list page in a single pydantic-core call
+property_summaries = TypeAdapter(List[PropertySummaryOut])
+
+
+# ObjectId hex strings; checked up front so malformed ids never reach bson
+is_object_id = re.compile(r"[0-9a-fA-F]{24}").fullmatch
+
+
+@lru_cache(maxsize=4096)
+def to_object_id(value: str) -> ObjectId:
+    return ObjectId(value)
+
+
+# Unfiltered property list responses are cached as encoded JSON under
+# "props:<limit>"; limit is bounded so the key space stays small
+PROPERTY_LIST_TTL = 60
+PROPERTY_LIST_MAX_LIMIT = 100
+
+
+async def invalidate_property_lists():
+    if cache is None:
+        return
+    # The cache is optional: a Redis failure must not fail the write that
+    # triggered it, entries simply expire after PROPERTY_LIST_TTL
+    try:
+        keys = [key async for key in cache.scan_iter("props:*")]
+        if keys:
+            await cache.delete(*keys)
+    except RedisError:
+        logger.exception("Failed to invalidate cached property lists")
+
+
+@app.on_event("startup")
+async def ensure_indexes():
+    if db is None:
+        return
+    # Serves the newest-first list, with and without a status filter. Best
+    # effort: an unreachable database must not stop the app from starting
+    try:
+        await db["property"].create_index([("status", 1), ("created_at", -1)])
+        await db["property"].create_index([("created_at", -1)])
+    except Exception:
+        logger.exception("Failed to ensure property indexes")
+
+
+# Liveness payload is constant, so the encoded response is built once
+ROOT_RESPONSE = ORJSONResponse({"message": "Real Estate API is running"})
+
+# Health report is reused for requests within the same 5 second window
+HEALTH_TTL = 5
+_health_cache = (None, None)
+
+# Collection names change rarely; keep the admin command off most health checks
+COLLECTIONS_TTL = 30
+_collections_cache = (None, None)
+
+
+async def list_collections():
+    global _collections_cache
+    bucket = int(time.time() // COLLECTIONS_TTL)
+    if _collections_cache[0] != bucket:
+        _collections_cache = (bucket, await db.list_collection_names())
+    return _collections_cache[1]
 
 
 @app.get("/")
-def read_root():
-    return {"message": "Real Estate API is running"}
+async def read_root():
+    return ROOT_RESPONSE
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
+    global _health_cache
+    bucket = int(time.time() // HEALTH_TTL)
+    if _health_cache[0] == bucket:
+        return _health_cache[1]
+
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -58,38 +175,84 @@ def test_database():
             response["database_name"] = db.name
             response["connection_status"] = "Connected"
             try:
-                response["collections"] = db.list_collection_names()
+                response["collections"] = await list_collections()
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
                 response["database"] = f"⚠️ Connected but Error: {str(e)[:60]}"
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:60]}"
+    _health_cache = (bucket, response)
     return response
 
 
 # Properties
 @app.get("/api/properties", response_model=List[dict])
-def list_properties(limit: Optional[int] = 20):
-    docs = get_documents("property", {}, limit)
-    return [to_public_id(doc) for doc in docs]
+async def list_properties(
+    limit: int = Query(20, ge=1, le=PROPERTY_LIST_MAX_LIMIT),
+    status: Optional[str] = Query(None, max_length=32),
+):
+    # Status filters are free-form, so only the unfiltered pages are cached
+    use_cache = cache is not None and status is None
+    key = f"props:{limit}"
+    if use_cache:
+        try:
+            cached = await cache.get(key)
+        except RedisError:
+            logger.exception("Failed to read cached property list")
+            cached = None
+        if cached:
+            return Response(cached, media_type="application/json")
+
+    pipeline = [
+        {"$match": {"status": status} if status else {}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": limit},
+        {"$project": PROPERTY_LIST_PROJECTION},
+    ]
+    docs = await aggregate_documents("property", pipeline)
+    # Return the encoded payload directly so FastAPI skips jsonable_encoder on the list
+    payload = property_summaries.dump_json(property_summaries.validate_python(docs))
+    if use_cache:
+        try:
+            await cache.setex(key, PROPERTY_LIST_TTL, payload)
+        except RedisError:
+            logger.exception("Failed to cache property list")
+    return Response(payload, media_type="application/json")
 
 
 @app.get("/api/properties/{property_id}")
-def get_property(property_id: str):
-    try:
-        doc = db["property"].find_one({"_id": ObjectId(property_id)})
-    except Exception:
-        doc = None
+async def get_property(property_id: str):
+    doc = None
+    if is_object_id(property_id):
+        doc = await db["property"].find_one({"_id": to_object_id(property_id)})
     if not doc:
         raise HTTPException(status_code=404, detail="Property not found")
-    return to_public_id(doc)
+    return property_response(doc)
+
 
+# Request bodies are parsed and validated straight from bytes by pydantic-core
+property_adapter = TypeAdapter(Property)
 
-@app.post("/api/properties")
-def create_property(payload: Property):
-    new_id = create_document("property", payload)
-    doc = db["property"].find_one({"_id": ObjectId(new_id)})
-    return to_public_id(doc)
+
+@app.post(
+    "/api/properties",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": property_adapter.json_schema()}},
+        }
+    },
+)
+async def create_property(request: Request):
+    try:
+        payload = property_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        )
+    doc = await create_document("property", payload)
+    await invalidate_property_lists()
+    return property_response(doc)
 
 
 # Inquiries
@@ -102,81 +265,220 @@ class InquiryIn(BaseModel):
     source: Optional[str] = "website"
 
 
+# Inquiries are acknowledged immediately and written in batches: a flush
+# happens once INQUIRY_BATCH_SIZE are queued or INQUIRY_FLUSH_INTERVAL
+# seconds after the first one arrived, whichever comes first. Failed writes
+# are retried until they succeed or the app shuts down
+INQUIRY_BATCH_SIZE = 100
+INQUIRY_FLUSH_INTERVAL = 0.05
+# Bounds per-worker memory when Mongo falls behind; beyond it new inquiries get a 503
+INQUIRY_QUEUE_SIZE = 10000
+_inquiry_queue = asyncio.Queue(maxsize=INQUIRY_QUEUE_SIZE)
+_inquiry_flusher = None
+
+
+INQUIRY_RETRY_MAX_DELAY = 5
+INQUIRY_SHUTDOWN_TIMEOUT = 10
+_inquiry_batch = []
+
+
+async def write_inquiries(batch):
+    """Insert a batch of inquiries and return the entries that still need writing"""
+    try:
+        await db["inquiry"].insert_many(batch, ordered=False)
+        return []
+    except BulkWriteError as e:
+        if e.details.get("writeConcernErrors"):
+            # Nothing is known to be durable; retrying is safe because the
+            # _ids are fixed and duplicates are ignored below
+            remaining = batch
+        else:
+            # 11000 means an earlier attempt already stored that inquiry
+            failed = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != 11000}
+            remaining = [doc for index, doc in enumerate(batch) if index in failed]
+        if remaining:
+            logger.error("Failed to write %d of %d inquiries: %s", len(remaining), len(batch), e)
+        return remaining
+    except Exception:
+        logger.exception("Failed to write %d inquiries", len(batch))
+        return batch
+
+
+async def flush_inquiries():
+    global _inquiry_batch
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        batch = [await _inquiry_queue.get()]
+        deadline = loop.time() + INQUIRY_FLUSH_INTERVAL
+        while len(batch) < INQUIRY_BATCH_SIZE and batch[-1] is not None:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_inquiry_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # None is the shutdown sentinel queued by stop_inquiry_flusher
+        if batch[-1] is None:
+            stopping = True
+            batch.pop()
+        # Clients were already answered, so keep retrying with backoff; while
+        # this blocks, the bounded queue pushes back on new inquiries
+        delay = INQUIRY_FLUSH_INTERVAL
+        _inquiry_batch = batch
+        while _inquiry_batch:
+            _inquiry_batch = await write_inquiries(_inquiry_batch)
+            if _inquiry_batch:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, INQUIRY_RETRY_MAX_DELAY)
+
+
+@app.on_event("startup")
+async def start_inquiry_flusher():
+    global _inquiry_flusher
+    if db is None:
+        return
+    _inquiry_flusher = asyncio.create_task(flush_inquiries())
+
+
+@app.on_event("shutdown")
+async def stop_inquiry_flusher():
+    if _inquiry_flusher is None or _inquiry_flusher.done():
+        return
+
+    # Let the flusher write everything queued before the sentinel, then exit
+    async def drain():
+        await _inquiry_queue.put(None)
+        await _inquiry_flusher
+
+    try:
+        await asyncio.wait_for(drain(), INQUIRY_SHUTDOWN_TIMEOUT)
+    except asyncio.TimeoutError:
+        unwritten = len(_inquiry_batch)
+        while not _inquiry_queue.empty():
+            if _inquiry_queue.get_nowait() is not None:
+                unwritten += 1
+        logger.error("Gave up writing %d inquiries on shutdown", unwritten)
+
+
 @app.post("/api/inquiries")
-def create_inquiry(payload: InquiryIn):
+async def create_inquiry(payload: InquiryIn):
     # If property_id exists, ensure it's valid but don't fail hard if not provided
-    if payload.property_id:
-        try:
-            _ = ObjectId(payload.property_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid property_id")
+    if payload.property_id and not is_object_id(payload.property_id):
+        raise HTTPException(status_code=400, detail="Invalid property_id")
+    if _inquiry_flusher is None or _inquiry_flusher.done():
+        raise HTTPException(status_code=503, detail="Database not available")
 
-    new_id = create_document("inquiry", payload.model_dump())
-    return {"id": new_id, "status": "received"}
+    now = utc_now()
+    doc = payload.model_dump()
+    doc["_id"] = ObjectId()
+    doc["created_at"] = now
+    doc["updated_at"] = now
+    try:
+        _inquiry_queue.put_nowait(doc)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many pending inquiries, try again shortly")
+    return {"id": str(doc["_id"]), "status": "received"}
+
+
+# Fixed sample listing, validated once at import
+SAMPLE_PROPERTY = Property(
+    title="Modern Craftsman with Valley Views",
+    address="1234 Maple Ridge Dr",
+    city="San Jose",
+    state="CA",
+    zipcode="95120",
+    price=1495000,
+    status="For Sale",
+    beds=4,
+    baths=3.5,
+    sqft=2650,
+    lot_size=0.25,
+    year_built=2016,
+    property_type="Single Family",
+    hoa_fee=85.0,
+    price_per_sqft=564.15,
+    days_on_market=3,
+    photos=[
+        "https://images.unsplash.com/photo-1600585154526-990dced4db0d",
+        "https://images.unsplash.com/photo-1560185127-6ed189bf02f4",
+        "https://images.unsplash.com/photo-1560448075-bb4caa6c0f11",
+        "https://images.unsplash.com/photo-1505691723518-36a5ac3b2d95"
+    ],
+    description=(
+        "This sun‑filled craftsman blends modern amenities with timeless charm. "
+        "Wide-plank floors, chef’s kitchen with quartz counters, and an indoor/outdoor layout "
+        "that flows to a flat backyard and pergola. Primary suite with balcony and spa bath."
+    ),
+    features=[
+        "Chef’s kitchen with 36\" range",
+        "Walk-in pantry",
+        "Vaulted great room",
+        "Upstairs laundry",
+        "EV-ready garage",
+        "Owned solar",
+        "Dual-zone HVAC",
+        "Smart irrigation"
+    ],
+    latitude=37.227,
+    longitude=-121.89,
+    schools=[
+        "Williams Elementary (9/10)",
+        "Bret Harte Middle (8/10)",
+        "Leland High (10/10)"
+    ],
+    open_house=[
+        "Sat 1–4 PM",
+        "Sun 12–3 PM"
+    ],
+    agent_name="Alex Morgan",
+    agent_phone="(408) 555-0133",
+    agent_email="alex@example.com",
+).model_dump()
+
+
+# The sample is stored once under a fixed id; the seeder just replays it
+SAMPLE_PROPERTY_ID = ObjectId("5eed00000000000000000001")
+_seed_response = None
+
+
+@app.on_event("startup")
+async def ensure_sample_property():
+    global _seed_response
+    if db is None:
+        return
+    # Best effort: if Mongo is unreachable the app still starts, and the
+    # seeder retries on its next call
+    try:
+        now = datetime.now(timezone.utc)
+        doc = await db["property"].find_one_and_update(
+            {"_id": SAMPLE_PROPERTY_ID},
+            {"$setOnInsert": {**SAMPLE_PROPERTY, "created_at": now, "updated_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        await invalidate_property_lists()
+    except Exception:
+        logger.exception("Failed to ensure the sample property")
+        return
+    _seed_response = property_response(doc)
 
 
 # Seeder endpoint to quickly add a sample property
 @app.post("/api/seed")
-def seed_sample_property():
-    sample = Property(
-        title="Modern Craftsman with Valley Views",
-        address="1234 Maple Ridge Dr",
-        city="San Jose",
-        state="CA",
-        zipcode="95120",
-        price=1495000,
-        status="For Sale",
-        beds=4,
-        baths=3.5,
-        sqft=2650,
-        lot_size=0.25,
-        year_built=2016,
-        property_type="Single Family",
-        hoa_fee=85.0,
-        price_per_sqft=564.15,
-        days_on_market=3,
-        photos=[
-            "https://images.unsplash.com/photo-1600585154526-990dced4db0d",
-            "https://images.unsplash.com/photo-1560185127-6ed189bf02f4",
-            "https://images.unsplash.com/photo-1560448075-bb4caa6c0f11",
-            "https://images.unsplash.com/photo-1505691723518-36a5ac3b2d95"
-        ],
-        description=(
-            "This sun‑filled craftsman blends modern amenities with timeless charm. "
-            "Wide-plank floors, chef’s kitchen with quartz counters, and an indoor/outdoor layout "
-            "that flows to a flat backyard and pergola. Primary suite with balcony and spa bath."
-        ),
-        features=[
-            "Chef’s kitchen with 36\" range",
-            "Walk-in pantry",
-            "Vaulted great room",
-            "Upstairs laundry",
-            "EV-ready garage",
-            "Owned solar",
-            "Dual-zone HVAC",
-            "Smart irrigation"
-        ],
-        latitude=37.227,
-        longitude=-121.89,
-        schools=[
-            "Williams Elementary (9/10)",
-            "Bret Harte Middle (8/10)",
-            "Leland High (10/10)"
-        ],
-        open_house=[
-            "Sat 1–4 PM",
-            "Sun 12–3 PM"
-        ],
-        agent_name="Alex Morgan",
-        agent_phone="(408) 555-0133",
-        agent_email="alex@example.com",
-    )
-    new_id = create_document("property", sample)
-    doc = db["property"].find_one({"_id": ObjectId(new_id)})
-    return to_public_id(doc)
+async def seed_sample_property():
+    if _seed_response is None:
+        await ensure_sample_property()
+    if _seed_response is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return _seed_response
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Each worker has its own Mongo pool (see MONGO_MAX_POOL_SIZE in database.py),
+    # so total connections scale with the worker count
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, loop="uvloop", http="httptools", workers=workers)
@@ -9,7 +9,7 @@ Model name is converted to lowercase for the collection name:
 - BlogPost -> "blogpost" collection
 """
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -19,6 +19,8 @@ class Property(BaseModel):
     Real estate listing
     Collection name: "property"
     """
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     # Basics
     title: str = Field(..., description="Marketing title for the property")
     address: str = Field(..., description="Full street address")
@@ -40,9 +42,9 @@ class Property(BaseModel):
     days_on_market: Optional[int] = Field(None)
 
     # Media
-    photos: List[HttpUrl] = Field(default_factory=list)
-    video_url: Optional[HttpUrl] = None
-    virtual_tour_url: Optional[HttpUrl] = None
+    photos: List[str] = Field(default_factory=list)
+    video_url: Optional[str] = None
+    virtual_tour_url: Optional[str] = None
 
     # Description & features
     description: Optional[str] = None
@@ -67,12 +69,26 @@ class Property(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+    @field_validator("photos", "video_url", "virtual_tour_url")
+    @classmethod
+    def check_http_urls(cls, value):
+        # Cheap scheme check instead of HttpUrl's full URL parse
+        if value is None:
+            return value
+        urls = value if isinstance(value, list) else [value]
+        for url in urls:
+            if not url.startswith(("http://", "https://")):
+                raise ValueError("must be an http(s) URL")
+        return value
+
 
 class Inquiry(BaseModel):
     """
     Buyer inquiries captured from the contact form
     Collection name: "inquiry"
     """
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     property_id: Optional[str] = Field(None, description="Related property document id")
     name: str
     email: str